@@ -2,7 +2,17 @@
 
 from .config import Config
 from .models import ReviewAnalysis, ReviewComment, ReviewSeverity
-from .neura_review import NeuraReview
 
 __version__ = "1.0.0"
 __all__ = ["NeuraReview", "Config", "ReviewSeverity", "ReviewAnalysis", "ReviewComment"]
+
+
+def __getattr__(name: str):
+    # NeuraReview loads the OpenAI and GitHub SDKs, so it is only imported
+    # once something actually asks for it
+    if name == "NeuraReview":
+        from .neura_review import NeuraReview
+
+        globals()["NeuraReview"] = NeuraReview
+        return NeuraReview
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,21 @@
 """AI-powered code reviewer with improved prompts."""
 
+import asyncio
 import json
 import logging
 import os
-from typing import Any, Dict
+import re
+from functools import lru_cache
+from importlib.resources import files
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import AsyncOpenAI, OpenAI
+from openai import AsyncOpenAI
 
 from .config import AIConfig
-from .diff_parser import DiffParser
 from .models import (
     ChangeType,
     DiffHunk,
+    DiffLine,
     FileDiff,
     LineType,
     ReviewAnalysis,
@@ -19,47 +23,271 @@ from .models import (
     ReviewIssue,
     ReviewSeverity,
 )
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
 
+class _IncompleteResponseError(Exception):
+    """Raised when the model stops before finishing its analysis."""
+
+
+# The fixed instructions come first and the hunks last, so every request shares
+# the longest possible byte-identical prefix for provider-side prompt caching
+_FILE_PROMPT_TEMPLATE = (
+    "**REQUIREMENTS:**\n"
+    "1. Analyze EVERY added and removed line.\n"
+    "2. For each issue, provide the exact line number from the diff below.\n"
+    "3. For each issue, set `hunk_id` to the ID of the hunk it belongs to.\n"
+    "4. For suggestions, provide ONLY pure code, no text, no markdown, "
+    "no explanations in the suggestion field.\n\n"
+    "Please review the following code changes from the file `{filename}`:\n\n"
+    "{hunks}"
+)
+
+_HUNK_SECTION_TEMPLATE = "### HUNK {hunk_id}\n```diff\n{header}\n{diff}\n```"
+
+# Built once so every request sends a byte-identical tool definition
+_FUNCTION_SCHEMA = {
+    "type": "function",
+    "name": "create_review_analysis",
+    "description": ("Create a structured code review analysis for a file's hunks"),
+    "strict": True,
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "issues": {
+                "type": "array",
+                "description": ("List of specific issues found in the hunks"),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "hunk_id": {
+                            "type": "integer",
+                            "description": "ID of the hunk this issue belongs to",
+                        },
+                        "title": {"type": "string"},
+                        "description": {"type": "string"},
+                        "severity": {
+                            "type": "string",
+                            "enum": [
+                                "critical",
+                                "high",
+                                "medium",
+                                "low",
+                                "info",
+                            ],
+                        },
+                        "change_type": {
+                            "type": "string",
+                            "enum": [
+                                "bug",
+                                "performance",
+                                "security",
+                                "memory",
+                                "error_handling",
+                            ],
+                        },
+                        "target_lines": {
+                            "type": "array",
+                            "description": (
+                                "Line numbers from the diff that this "
+                                "issue applies to"
+                            ),
+                            "items": {"type": "integer"},
+                        },
+                        "suggestion": {"type": ["string", "null"]},
+                    },
+                    "required": [
+                        "hunk_id",
+                        "title",
+                        "description",
+                        "severity",
+                        "change_type",
+                        "target_lines",
+                        "suggestion",
+                    ],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["issues"],
+        "additionalProperties": False,
+    },
+}
+
+_LANGUAGE_BY_EXTENSION = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".ts": "TypeScript",
+    ".jsx": "React JSX",
+    ".tsx": "React TSX",
+    ".java": "Java",
+    ".cpp": "C++",
+    ".c": "C",
+    ".cs": "C#",
+    ".php": "PHP",
+    ".rb": "Ruby",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".swift": "Swift",
+    ".kt": "Kotlin",
+    ".scala": "Scala",
+    ".sh": "Shell",
+    ".bash": "Bash",
+    ".zsh": "Zsh",
+    ".html": "HTML",
+    ".css": "CSS",
+    ".scss": "SCSS",
+    ".sass": "Sass",
+    ".less": "Less",
+}
+
+_SEVERITY_COLORS = {
+    ReviewSeverity.CRITICAL: "red",
+    ReviewSeverity.HIGH: "orange",
+    ReviewSeverity.MEDIUM: "yellow",
+    ReviewSeverity.LOW: "blue",
+    ReviewSeverity.INFO: "informational",
+}
+
+# Badge markdown is fixed per severity, so it is rendered once at import
+_SEVERITY_BADGES = {
+    severity: (
+        f"![Severity: {severity.value.capitalize()}]"
+        f"(https://img.shields.io/badge/Severity-{severity.value.capitalize()}"
+        f"-{_SEVERITY_COLORS.get(severity, 'lightgrey')})"
+    )
+    for severity in ReviewSeverity
+}
+
+
+# Markdown fences the model sometimes wraps suggestions in: the opening line
+# (with any language tag) and a closing line holding only the fence
+_OPENING_FENCE_RE = re.compile(r"\A```[^\n]*\n?")
+_CLOSING_FENCE_RE = re.compile(r"(?:\A|\n)[ \t]*```\Z")
+
+
+@lru_cache(maxsize=None)
+def _read_prompt_template() -> str:
+    """Read prompt.md once per process and share it between reviewers."""
+    # Resolve prompt.md as package data so it also loads from zipped installs
+    return files(__package__).joinpath("prompt.md").read_text(encoding="utf-8")
+
+
+def _format_diff_line(line: DiffLine) -> str:
+    """Format a diff line as its sign, file line number and content."""
+    # Removed lines only exist in the old file; added and context lines are
+    # numbered in the new one and their type value is already the sign.
+    if line.type is LineType.REMOVED:
+        return f"-{line.old_line_number:4d}: {line.content}"
+    return f"{line.type.value}{line.new_line_number:4d}: {line.content}"
+
+
+def _longest_consecutive_range(numbers: list[int]) -> tuple[int, int] | None:
+    """Return the longest run of consecutive numbers, earliest first on ties."""
+    present = set(numbers)
+    best: tuple[int, int] | None = None
+    for start in present:
+        # Only walk runs from their first number so each run is seen once
+        if start - 1 in present:
+            continue
+        end = start
+        while end + 1 in present:
+            end += 1
+        if (
+            best is None
+            or end - start > best[1] - best[0]
+            or (end - start == best[1] - best[0] and start < best[0])
+        ):
+            best = (start, end)
+    return best
+
+
 class AIReviewer:
     """AI-powered code reviewer."""
 
     def __init__(self, config: AIConfig):
         """Initialize AI reviewer."""
         self.config = config
-        self.client = OpenAI(api_key=config.api_key)
-        self.async_client = AsyncOpenAI(api_key=config.api_key)
-        self.diff_parser = DiffParser()
+        self.async_client = AsyncOpenAI(
+            api_key=config.api_key, max_retries=config.max_retries
+        )
         self.prompt = self._load_prompt()
-        self.client = OpenAI(api_key=config.api_key)
+        # Rendered system prompts by language, so each is formatted once
+        self._system_prompts: Dict[str, str] = {}
+        # AI results keyed by (system prompt, user prompt), so repeated diffs
+        # within a PR are only sent once; cleared between PRs
+        self._analysis_cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._pending_analyses: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        self._request_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.response_cache: Optional[ResponseCache] = None
+        if config.response_cache_path:
+            self.response_cache = ResponseCache(
+                config.response_cache_path, config.response_cache_ttl
+            )
+
+    async def aclose(self) -> None:
+        """Close the AI client's connection pool and the response cache."""
+        await self.async_client.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def clear_analysis_cache(self) -> None:
+        """Drop the AI results remembered from earlier reviews."""
+        self._analysis_cache.clear()
 
     def _load_prompt(self) -> str:
         """Load the system prompt from prompt.md."""
         try:
-            # Look for prompt.md in the same directory as this file
-            prompt_path = os.path.join(os.path.dirname(__file__), "prompt.md")
-            with open(prompt_path, "r") as f:
-                return f.read()
+            return _read_prompt_template()
         except FileNotFoundError:
             logger.error("prompt.md not found. Please create it in the src directory.")
             return "You are a helpful code reviewer."
 
     def analyze_file(self, file_diff: FileDiff) -> ReviewAnalysis:
-        """Analyze a single file and generate review comments."""
-        try:
-            # File filtering is now handled at the NeuraReview level
-            self.diff_parser.parse_file_diff(file_diff)
+        """Analyze a parsed file and generate review comments."""
+        return asyncio.run(self.analyze_file_async(file_diff))
 
+    async def analyze_file_async(self, file_diff: FileDiff) -> ReviewAnalysis:
+        """Analyze a parsed file, reviewing its hunks in as few requests as fit."""
+        try:
             overall_comment = f"Review for {file_diff.filename}"
             all_issues = []
             all_comments = []
 
-            for hunk in file_diff.hunks:
-                issues, comments = self._analyze_hunk(file_diff, hunk)
-                all_issues.extend(issues)
-                all_comments.extend(comments)
+            hunks = file_diff.hunks
+            if self.config.skip_trivial_hunks:
+                hunks = [hunk for hunk in hunks if self._has_code_changes(hunk)]
+            if self.config.skip_deletion_only_hunks:
+                hunks = [hunk for hunk in hunks if self._has_added_code(hunk)]
+            if not hunks:
+                return self._create_empty_analysis(
+                    file_diff.filename, "no code changes to review"
+                )
+
+            # Small files go out as a single request; larger ones are split
+            # into batches that are reviewed concurrently
+            batches = self._batch_hunks(hunks)
+            ai_responses = await asyncio.gather(
+                *(
+                    self._generate_ai_analysis_async(file_diff.filename, batch)
+                    for batch in batches
+                )
+            )
+
+            # Results are collected in hunk order to keep the output deterministic
+            for batch, ai_response in zip(batches, ai_responses):
+                issues_by_hunk = self._group_issues_by_hunk(
+                    ai_response, file_diff.filename, batch
+                )
+                for hunk_id, hunk in enumerate(batch, 1):
+                    issues, comments = self._process_ai_response(
+                        {"issues": issues_by_hunk[hunk_id]}, file_diff.filename, hunk
+                    )
+                    all_issues.extend(issues)
+                    all_comments.extend(comments)
 
             return ReviewAnalysis(
                 overall_comment=overall_comment,
@@ -73,21 +301,83 @@ class AIReviewer:
             logger.error(f"Error analyzing file {file_diff.filename}: {e}")
             return self._create_empty_analysis(file_diff.filename, f"Error: {e}")
 
-    async def _analyze_hunk_async(self, file_diff: FileDiff, hunk: DiffHunk):
-        """Analyze a single hunk of a file asynchronously."""
-        try:
-            ai_response = await self._generate_ai_analysis_async(
-                file_diff.filename, hunk
-            )
-            issues, comments = self._process_ai_response(
-                ai_response, file_diff.filename, hunk
-            )
-            return issues, comments
-        except Exception as e:
-            logger.error(
-                f"Error analyzing hunk for {file_diff.filename}: {e}", exc_info=True
-            )
-            return [], []
+    def _has_code_changes(self, hunk: DiffHunk) -> bool:
+        """Check whether a hunk adds or removes any non-whitespace line."""
+        return self._has_added_code(hunk) or any(
+            line.content.strip() for line in hunk.removed_lines
+        )
+
+    def _has_added_code(self, hunk: DiffHunk) -> bool:
+        """Check whether a hunk adds any line with non-whitespace content."""
+        return any(line.content.strip() for line in hunk.added_lines)
+
+    def _batch_hunks(self, hunks: List[DiffHunk]) -> List[List[DiffHunk]]:
+        """Pack consecutive hunks into batches under the token budget."""
+        batches: List[List[DiffHunk]] = []
+        current: List[DiffHunk] = []
+        current_tokens = 0
+        # Each hunk needs its own share of the output budget
+        max_hunks = max(
+            1, self.config.max_batch_output_tokens // self.config.max_tokens
+        )
+        for hunk in hunks:
+            # Roughly four characters per token, counting the sign and line
+            # number prefix each line gets in the prompt
+            tokens = sum(len(line.content) + 8 for line in hunk.lines) // 4
+            if current and (
+                current_tokens + tokens > self.config.max_batch_tokens
+                or len(current) >= max_hunks
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(hunk)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _group_issues_by_hunk(
+        self, ai_response: Dict[str, Any], filename: str, hunks: List[DiffHunk]
+    ) -> Dict[int, list]:
+        """Partition the AI issues by the 1-based ID of the hunk they refer to."""
+        issues_by_hunk: Dict[int, list] = {
+            hunk_id: [] for hunk_id in range(1, len(hunks) + 1)
+        }
+        line_indexes = {
+            hunk_id: self._index_hunk_lines(hunk)
+            for hunk_id, hunk in enumerate(hunks, 1)
+        }
+        for issue_data in ai_response.get("issues", []):
+            hunk_id = issue_data.get("hunk_id")
+            target_lines = issue_data.get("target_lines")
+            if not isinstance(target_lines, list):
+                target_lines = []
+
+            def resolves(candidate: int) -> bool:
+                return bool(
+                    self._find_diff_lines_for_targets(
+                        line_indexes[candidate], target_lines
+                    )
+                )
+
+            if hunk_id not in issues_by_hunk or not resolves(hunk_id):
+                # The model sometimes omits or mislabels the hunk ID; fall back
+                # to whichever hunk in the batch contains the target lines
+                fallback = next(
+                    (candidate for candidate in line_indexes if resolves(candidate)),
+                    None,
+                )
+                if fallback is None:
+                    logger.warning(
+                        f"Issue '{issue_data.get('title')}' in {filename} has "
+                        f"hunk_id {hunk_id} and target_lines {target_lines} that "
+                        f"match no hunk, skipping"
+                    )
+                    continue
+                hunk_id = fallback
+            issues_by_hunk[hunk_id].append(issue_data)
+        return issues_by_hunk
 
     def _create_empty_analysis(self, file_path: str, reason: str) -> ReviewAnalysis:
         """Create an empty review analysis."""
@@ -101,181 +391,204 @@ class AIReviewer:
 
     def _get_file_language(self, filename: str) -> str:
         """Detect programming language from filename."""
-        language_map = {
-            ".py": "Python",
-            ".js": "JavaScript",
-            ".ts": "TypeScript",
-            ".jsx": "React JSX",
-            ".tsx": "React TSX",
-            ".java": "Java",
-            ".cpp": "C++",
-            ".c": "C",
-            ".cs": "C#",
-            ".php": "PHP",
-            ".rb": "Ruby",
-            ".go": "Go",
-            ".rs": "Rust",
-            ".swift": "Swift",
-            ".kt": "Kotlin",
-            ".scala": "Scala",
-            ".sh": "Shell",
-            ".bash": "Bash",
-            ".zsh": "Zsh",
-            ".html": "HTML",
-            ".css": "CSS",
-            ".scss": "SCSS",
-            ".sass": "Sass",
-            ".less": "Less",
-        }
-
-        for ext, lang in language_map.items():
-            if filename.lower().endswith(ext):
-                return lang
+        extension = os.path.splitext(filename.lower())[1]
+        return _LANGUAGE_BY_EXTENSION.get(extension, "Unknown")
 
-        return "Unknown"
+    def _get_system_prompt(self, language: str) -> str:
+        """Return the system prompt rendered for a language."""
+        system_prompt = self._system_prompts.get(language)
+        if system_prompt is None:
+            system_prompt = self.prompt.format(language=language)
+            self._system_prompts[language] = system_prompt
+        return system_prompt
 
     async def _generate_ai_analysis_async(
-        self, filename: str, hunk: DiffHunk
+        self, filename: str, hunks: List[DiffHunk]
     ) -> Dict[str, Any]:
-        """Generate AI analysis for a single hunk."""
+        """Generate AI analysis for all hunks of a file."""
         language = self._get_file_language(filename)
-        system_prompt = self.prompt.format(language=language)
-        user_prompt = self._create_user_prompt_for_hunk(filename, hunk)
-
-        function_schema = {
-            "type": "function",
-            "name": "create_review_analysis",
-            "description": ("Create a structured code review analysis for a hunk"),
-            "strict": True,
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "issues": {
-                        "type": "array",
-                        "description": ("List of specific issues found in the hunk"),
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "title": {"type": "string"},
-                                "description": {"type": "string"},
-                                "severity": {
-                                    "type": "string",
-                                    "enum": [
-                                        "critical",
-                                        "high",
-                                        "medium",
-                                        "low",
-                                        "info",
-                                    ],
-                                },
-                                "change_type": {
-                                    "type": "string",
-                                    "enum": [
-                                        "bug",
-                                        "performance",
-                                        "security",
-                                        "memory",
-                                        "error_handling",
-                                    ],
-                                },
-                                "target_lines": {
-                                    "type": "array",
-                                    "description": (
-                                        "Line numbers from the diff that this "
-                                        "issue applies to"
-                                    ),
-                                    "items": {"type": "integer"},
-                                },
-                                "suggestion": {"type": ["string", "null"]},
-                            },
-                            "required": [
-                                "title",
-                                "description",
-                                "severity",
-                                "change_type",
-                                "target_lines",
-                                "suggestion",
-                            ],
-                            "additionalProperties": False,
-                        },
-                    }
-                },
-                "required": ["issues"],
-                "additionalProperties": False,
-            },
-        }
+        system_prompt = self._get_system_prompt(language)
+        user_prompt = self._create_user_prompt_for_hunks(filename, hunks)
+        reasoning_effort = self._select_reasoning_effort(hunks)
+        max_output_tokens = min(
+            self.config.max_tokens * len(hunks), self.config.max_batch_output_tokens
+        )
 
-        try:
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ]
-            response = await self.async_client.responses.create(
-                store=False,
-                model="gpt-5-mini",
-                input=messages,
-                tools=[function_schema],
-                tool_choice="auto",
-                parallel_tool_calls=False,
-                reasoning={"effort": "low", "summary": "auto"},
-                max_output_tokens=self.config.max_tokens,
-                stream=False,
+        cache_key = (system_prompt, user_prompt)
+        if cache_key in self._analysis_cache:
+            logger.debug(f"Using cached AI analysis for {filename}")
+            return self._analysis_cache[cache_key]
+
+        # Coalesce concurrent identical requests onto a single API call
+        pending = self._pending_analyses.get(cache_key)
+        if pending is None:
+            pending = asyncio.ensure_future(
+                self._request_ai_analysis_async(
+                    system_prompt, user_prompt, reasoning_effort, max_output_tokens
+                )
+            )
+            self._pending_analyses[cache_key] = pending
+            pending.add_done_callback(
+                lambda _: self._pending_analyses.pop(cache_key, None)
             )
 
-            arguments: Dict[str, Any] = {}
-            for output in response.output:
-                logger.debug(f"AI response: {output}")
-                if output.type == "function_call":
-                    raw_arguments = output.arguments
-                    logger.debug(f"Raw AI response arguments: {raw_arguments}")
-                    arguments = json.loads(raw_arguments)
-                else:
-                    logger.warning(output)
-
-            if not arguments:
-                logger.warning("No arguments in AI response")
+        try:
+            arguments = await asyncio.shield(pending)
+        except _IncompleteResponseError as e:
+            if len(hunks) == 1:
+                logger.error(f"AI analysis for {filename} was cut off: {e}")
                 return {"issues": []}
-            return arguments
+            # A truncated batch would otherwise report all its hunks as clean,
+            # so review each half on its own budget instead
+            logger.warning(
+                f"AI analysis for {filename} was cut off ({e}), "
+                f"splitting {len(hunks)} hunks into two requests"
+            )
+            arguments = await self._generate_split_analysis_async(filename, hunks)
         except Exception as e:
-            logger.error(f"AI analysis failed for hunk in {filename}: {e}")
+            logger.error(f"AI analysis failed for {filename}: {e}")
             return {"issues": []}
 
-    def _create_user_prompt_for_hunk(self, filename: str, hunk: DiffHunk) -> str:
-        """Create user prompt with hunk changes."""
-        hunk_lines = []
-        for line in hunk.lines:
-            if line.type.value == "+":
-                hunk_lines.append(f"+{line.new_line_number:4d}: {line.content}")
-            elif line.type.value == "-":
-                hunk_lines.append(f"-{line.old_line_number:4d}: {line.content}")
-            else:
-                hunk_lines.append(f" {line.new_line_number:4d}: {line.content}")
-
-        hunk_diff = "\n".join(hunk_lines)
-
-        prompt = (
-            f"Please review the following code changes in a hunk "
-            f"from the file `{filename}`:\n\n"
-            f"```diff\n{hunk.header}\n{hunk_diff}\n```\n\n"
-            f"**REQUIREMENTS:**\n"
-            f"1. Analyze EVERY added and removed line.\n"
-            f"2. For each issue, provide the exact line number from the diff above.\n"
-            f"3. For suggestions, provide ONLY pure code, no text, no markdown, "
-            f"no explanations in the suggestion field."
+        self._analysis_cache[cache_key] = arguments
+        return arguments
+
+    async def _generate_split_analysis_async(
+        self, filename: str, hunks: List[DiffHunk]
+    ) -> Dict[str, Any]:
+        """Analyze the two halves of a batch and merge them under its hunk IDs."""
+        middle = len(hunks) // 2
+        first, second = await asyncio.gather(
+            self._generate_ai_analysis_async(filename, hunks[:middle]),
+            self._generate_ai_analysis_async(filename, hunks[middle:]),
+        )
+        issues = list(first.get("issues", []))
+        for issue_data in second.get("issues", []):
+            hunk_id = issue_data.get("hunk_id")
+            if isinstance(hunk_id, int):
+                issue_data = {**issue_data, "hunk_id": hunk_id + middle}
+            issues.append(issue_data)
+        return {"issues": issues}
+
+    def _select_reasoning_effort(self, hunks: List[DiffHunk]) -> str:
+        """Pick the reasoning effort from the size of the change under review."""
+        # Removed lines weigh double since the model must reason about what
+        # the surrounding code loses, not just what it gains
+        score = 0
+        for hunk in hunks:
+            score += len(hunk.added_lines) + 2 * len(hunk.removed_lines)
+
+        if score < self.config.small_change_threshold:
+            return self.config.small_change_reasoning_effort
+        return self.config.reasoning_effort
+
+    def _get_request_semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding in-flight AI requests on this loop."""
+        # asyncio primitives are bound to the loop that uses them, and the
+        # sync entry points start a fresh loop per call
+        loop = asyncio.get_running_loop()
+        if self._request_semaphore_loop is not loop:
+            self._request_semaphore = asyncio.Semaphore(
+                self.config.max_concurrent_requests
+            )
+            self._request_semaphore_loop = loop
+        return self._request_semaphore
+
+    async def _request_ai_analysis_async(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        reasoning_effort: str,
+        max_output_tokens: int,
+    ) -> Dict[str, Any]:
+        """Call the AI model and return the parsed function call arguments."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        request = {
+            "model": self.config.model,
+            "input": messages,
+            "tools": [_FUNCTION_SCHEMA],
+            "tool_choice": "auto",
+            "parallel_tool_calls": False,
+            "reasoning": {"effort": reasoning_effort, "summary": "auto"},
+            "max_output_tokens": max_output_tokens,
+        }
+
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(request)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Using cached AI response")
+                return cached
+
+        async with self._get_request_semaphore():
+            response = await self.async_client.responses.create(
+                store=False, stream=False, **request
+            )
+
+        logger.debug(f"AI response: {response.output}")
+
+        # Truncated function call arguments aren't valid JSON, and an empty
+        # result would read as a clean review
+        if response.status == "incomplete":
+            reason = getattr(response.incomplete_details, "reason", None)
+            raise _IncompleteResponseError(f"response incomplete: {reason}")
+
+        # Only the analysis call matters; reasoning items and any other output
+        # are skipped without being decoded
+        analysis_call = next(
+            (
+                output
+                for output in response.output
+                if output.type == "function_call"
+                and output.name == "create_review_analysis"
+            ),
+            None,
+        )
+
+        arguments: Dict[str, Any] = {}
+        if analysis_call is not None:
+            logger.debug(f"Raw AI response arguments: {analysis_call.arguments}")
+            arguments = json.loads(analysis_call.arguments)
+
+        if not arguments:
+            logger.warning("No arguments in AI response")
+            return {"issues": []}
+
+        if self.response_cache is not None:
+            self.response_cache.set(cache_key, arguments)
+        return arguments
+
+    def _create_user_prompt_for_hunks(
+        self, filename: str, hunks: List[DiffHunk]
+    ) -> str:
+        """Create user prompt with every hunk labelled by its 1-based ID."""
+        sections = [
+            _HUNK_SECTION_TEMPLATE.format(
+                hunk_id=hunk_id,
+                header=hunk.header,
+                diff="\n".join(map(_format_diff_line, hunk.lines)),
+            )
+            for hunk_id, hunk in enumerate(hunks, 1)
+        ]
+        return _FILE_PROMPT_TEMPLATE.format(
+            filename=filename, hunks="\n\n".join(sections)
         )
-        return prompt
 
     def _process_ai_response(
         self, ai_response: Dict[str, Any], filename: str, hunk: DiffHunk
     ) -> tuple[list[ReviewIssue], list[ReviewComment]]:
         """Process AI response into structured review analysis for a hunk."""
-        issues = []
-        comments = []
+        # First pass: validate the AI output and locate each issue in the hunk
+        located_issues: list[tuple[ReviewIssue, list]] = []
+        line_index = self._index_hunk_lines(hunk)
 
         for issue_data in ai_response.get("issues", []):
             try:
-                severity = ReviewSeverity(issue_data["severity"])
-                change_type = ChangeType(issue_data["change_type"])
+                severity = ReviewSeverity.from_value(issue_data["severity"])
+                change_type = ChangeType.from_value(issue_data["change_type"])
                 target_lines = issue_data.get("target_lines", [])
 
                 if not target_lines:
@@ -286,7 +599,7 @@ class AIReviewer:
                     continue
 
                 # Find the actual diff lines for the target line numbers
-                diff_lines = self._find_diff_lines_for_targets(hunk, target_lines)
+                diff_lines = self._find_diff_lines_for_targets(line_index, target_lines)
 
                 if not diff_lines:
                     logger.warning(
@@ -309,34 +622,45 @@ class AIReviewer:
                     suggestion=issue_data.get("suggestion"),
                     change_type=change_type,
                 )
-                issues.append(issue)
+                located_issues.append((issue, diff_lines))
 
-                # Create the review comment using hunk-aware logic
+            except Exception as e:
+                logger.error(f"Error processing AI issue for {filename}: {e}")
+                continue
+
+        issues = [issue for issue, _ in located_issues]
+
+        # Second pass: render review comments using hunk-aware logic
+        comments = []
+        for issue, diff_lines in located_issues:
+            try:
                 comment = self._create_comment_from_diff_lines(
                     diff_lines, issue, filename, hunk
                 )
-
-                if comment:
-                    comments.append(comment)
-
             except Exception as e:
-                logger.error(f"Error processing AI issue for {filename}: {e}")
+                logger.error(f"Error creating comment for {filename}: {e}")
                 continue
 
+            if comment:
+                comments.append(comment)
+
         return issues, comments
 
-    def _find_diff_lines_for_targets(self, hunk: DiffHunk, target_lines: list) -> list:
+    def _index_hunk_lines(self, hunk: DiffHunk) -> Dict[int, DiffLine]:
+        """Map each old and new line number in a hunk to its first DiffLine."""
+        line_index: Dict[int, DiffLine] = {}
+        for line in hunk.lines:
+            if line.new_line_number is not None:
+                line_index.setdefault(line.new_line_number, line)
+            if line.old_line_number is not None:
+                line_index.setdefault(line.old_line_number, line)
+        return line_index
+
+    def _find_diff_lines_for_targets(
+        self, line_index: Dict[int, DiffLine], target_lines: list
+    ) -> list:
         """Find DiffLine objects for the given target line numbers."""
-        diff_lines = []
-        for target_line in target_lines:
-            for line in hunk.lines:
-                if (
-                    line.new_line_number == target_line
-                    or line.old_line_number == target_line
-                ):
-                    diff_lines.append(line)
-                    break
-        return diff_lines
+        return [line_index[target] for target in target_lines if target in line_index]
 
     def _create_comment_from_diff_lines(
         self, diff_lines: list, issue: "ReviewIssue", filename: str, hunk: DiffHunk
@@ -352,49 +676,23 @@ class AIReviewer:
         if not diff_lines:
             return None
 
-        # Helper to compute longest consecutive range
-        def longest_consecutive_range(
-            numbers: list[int],
-        ) -> tuple[int, int] | None:
-            if not numbers:
-                return None
-            numbers = sorted(n for n in numbers if n is not None)
-            if not numbers:
-                return None
-            best_start = cur_start = numbers[0]
-            best_end = cur_end = numbers[0]
-            for n in numbers[1:]:
-                if n == cur_end + 1:
-                    cur_end = n
-                else:
-                    if (cur_end - cur_start) > (best_end - best_start):
-                        best_start, best_end = cur_start, cur_end
-                    cur_start = cur_end = n
-            if (cur_end - cur_start) > (best_end - best_start):
-                best_start, best_end = cur_start, cur_end
-            return (best_start, best_end)
-
-        # Partition lines by type
-        added_lines = [
-            diff_line for diff_line in diff_lines if diff_line.type == LineType.ADDED
-        ]
-        removed_lines = [
-            diff_line for diff_line in diff_lines if diff_line.type == LineType.REMOVED
-        ]
-
-        added_nums = [
-            diff_line.new_line_number
-            for diff_line in added_lines
-            if diff_line.new_line_number
-        ]
-        removed_nums = [
-            diff_line.old_line_number
-            for diff_line in removed_lines
-            if diff_line.old_line_number
-        ]
-
-        added_range = longest_consecutive_range(added_nums)
-        removed_range = longest_consecutive_range(removed_nums)
+        # Partition lines by type in a single pass
+        added_lines = []
+        removed_lines = []
+        added_nums = []
+        removed_nums = []
+        for diff_line in diff_lines:
+            if diff_line.type is LineType.ADDED:
+                added_lines.append(diff_line)
+                if diff_line.new_line_number:
+                    added_nums.append(diff_line.new_line_number)
+            elif diff_line.type is LineType.REMOVED:
+                removed_lines.append(diff_line)
+                if diff_line.old_line_number:
+                    removed_nums.append(diff_line.old_line_number)
+
+        added_range = _longest_consecutive_range(added_nums)
+        removed_range = _longest_consecutive_range(removed_nums)
 
         # Choose the best range: prefer added over removed, and longer ranges first
         start_line_number = None
@@ -428,23 +726,17 @@ class AIReviewer:
             )
         else:
             # Fallback to a single primary line: prefer added, then removed, then any
-            primary_line = None
-            for diff_line in diff_lines:
-                if diff_line.type == LineType.ADDED:
-                    primary_line = diff_line
-                    break
-            if not primary_line:
-                for diff_line in diff_lines:
-                    if diff_line.type == LineType.REMOVED:
-                        primary_line = diff_line
-                        break
-            if not primary_line:
+            if added_lines:
+                primary_line = added_lines[0]
+            elif removed_lines:
+                primary_line = removed_lines[0]
+            else:
                 primary_line = diff_lines[0]
 
-            if primary_line.type == LineType.ADDED:
+            if primary_line.type is LineType.ADDED:
                 side = "RIGHT"
                 line_number = primary_line.new_line_number
-            elif primary_line.type == LineType.REMOVED:
+            elif primary_line.type is LineType.REMOVED:
                 side = "LEFT"
                 line_number = primary_line.old_line_number
             else:
@@ -476,10 +768,7 @@ class AIReviewer:
 
     def _leading_whitespace(self, text: str) -> str:
         """Return the exact leading whitespace of a line (tabs/spaces preserved)."""
-        i = 0
-        while i < len(text) and text[i] in (" ", "\t"):
-            i += 1
-        return text[:i]
+        return text[: len(text) - len(text.lstrip(" \t"))]
 
     def _reindent_suggestion(self, suggestion: str, base_indent: str) -> str:
         """Re-indent a multi-line suggestion to align with target indentation.
@@ -493,49 +782,19 @@ class AIReviewer:
         if not non_empty:
             return suggestion
 
-        def leading_ws(s: str) -> int:
-            j = 0
-            while j < len(s) and s[j] in (" ", "\t"):
-                j += 1
-            return j
-
-        min_indent = min(leading_ws(ln) for ln in non_empty)
+        min_indent = min(len(ln) - len(ln.lstrip(" \t")) for ln in non_empty)
 
-        reindented: list[str] = []
-        for ln in lines:
-            if ln.strip():
-                # Strip the common minimal indent, then apply base indent
-                without_common = (
-                    ln[min_indent:] if len(ln) >= min_indent else ln.lstrip()
-                )
-                reindented.append(f"{base_indent}{without_common}")
-            else:
-                reindented.append(ln)
-        normalized = "\n".join(reindented).rstrip()
-        # Enforce drop-in replacement: do not include lines less-indented than base
-        base_len = len(base_indent)
-        filtered: list[str] = []
-        for ln in normalized.split("\n"):
-            if ln.strip() and len(self._leading_whitespace(ln)) < base_len:
-                continue
-            filtered.append(ln)
-        return "\n".join(filtered).rstrip()
+        # Strip the common minimal indent, then apply base indent. Every
+        # non-empty line ends up at least as indented as the base, so the
+        # result is a drop-in replacement for the target block.
+        reindented = [
+            f"{base_indent}{ln[min_indent:]}" if ln.strip() else ln for ln in lines
+        ]
+        return "\n".join(reindented).rstrip()
 
     def _severity_badge_markdown(self, severity: ReviewSeverity) -> str:
         """Return a shields.io markdown badge for the severity level."""
-        color_map = {
-            ReviewSeverity.CRITICAL: "red",
-            ReviewSeverity.HIGH: "orange",
-            ReviewSeverity.MEDIUM: "yellow",
-            ReviewSeverity.LOW: "blue",
-            ReviewSeverity.INFO: "informational",
-        }
-        color = color_map.get(severity, "lightgrey")
-        label = severity.value.capitalize()
-        return (
-            f"![Severity: {label}]"
-            f"(https://img.shields.io/badge/Severity-{label}-{color})"
-        )
+        return _SEVERITY_BADGES[severity]
 
     def _clean_suggestion(self, suggestion: str) -> str:
         """Clean suggestion to ensure it's pure code only."""
@@ -546,11 +805,7 @@ class AIReviewer:
 
         # Remove markdown code blocks
         if cleaned.startswith("```"):
-            lines = cleaned.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            cleaned = "\n".join(lines)
+            cleaned = _OPENING_FENCE_RE.sub("", cleaned, count=1)
+            cleaned = _CLOSING_FENCE_RE.sub("", cleaned, count=1)
 
         return cleaned.strip()
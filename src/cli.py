@@ -1,12 +1,13 @@
 import argparse
+import asyncio
+import logging
 import os
 import sys
 
-from .config import Config
-from .neura_review import NeuraReview
+from .logging_setup import configure_logging
 
 
-def main() -> int:
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="NeuraReview - AI-powered code review agent",
     )
@@ -14,23 +15,50 @@ def main() -> int:
     parser.add_argument("--pr", type=int, required=True, help="PR number")
     parser.add_argument("--dry-run", action="store_true", help="Preview only")
     parser.add_argument("--file", help="Analyze only a specific file in the PR")
-    parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logs")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--verbose", "-v", action="store_true", help="Verbose logs")
+    verbosity.add_argument(
+        "--quiet", "-q", action="store_true", help="Only log warnings and errors"
+    )
 
     # GitHub Action specific arguments
     parser.add_argument("--github-token", help="GitHub token (for GitHub Actions)")
     parser.add_argument("--openai-api-key", help="OpenAI API key (for GitHub Actions)")
+    return parser
 
-    args = parser.parse_args()
 
-    # Set up logging
-    import logging
+_PARSER = _build_parser()
 
-    log_level = logging.DEBUG if args.verbose else logging.INFO
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+
+async def _review(reviewer, args: argparse.Namespace) -> bool:
+    # Run the whole review on one loop so the AI client's pooled connections
+    # are closed on the loop that opened them
+    try:
+        return await reviewer.review_pull_request_async(
+            repo_name=args.repo, pr_number=args.pr, dry_run=args.dry_run
+        )
+    finally:
+        await reviewer.aclose()
+
+
+async def _analyze_file(reviewer, args: argparse.Namespace):
+    # Same as _review: analyze and close on one loop, which also closes the
+    # response cache
+    try:
+        return await reviewer.analyze_single_file_async(args.repo, args.pr, args.file)
+    finally:
+        await reviewer.aclose()
+
+
+def main() -> int:
+    args = _PARSER.parse_args()
+
+    # Set up logging. --verbose only lowers the level for NeuraReview's own
+    # loggers; debug output from the OpenAI, HTTP and GitHub libraries would
+    # drown it out
+    configure_logging(logging.WARNING if args.quiet else logging.INFO)
+    if args.verbose:
+        logging.getLogger(__package__).setLevel(logging.DEBUG)
     logger = logging.getLogger(__name__)
 
     try:
@@ -48,6 +76,11 @@ def main() -> int:
             logger.error("GITHUB_TOKEN environment variable is required")
             return 1
 
+        # Import lazily so --help and argument or environment errors don't pay
+        # for loading the OpenAI and GitHub SDKs
+        from .config import Config
+        from .neura_review import NeuraReview
+
         config = Config.from_env()
         reviewer = NeuraReview(config)
 
@@ -55,17 +88,18 @@ def main() -> int:
 
         if args.file:
             logger.info(f"Analyzing single file: {args.file}")
-            analysis = reviewer.analyze_single_file(args.repo, args.pr, args.file)
+            analysis = asyncio.run(_analyze_file(reviewer, args))
             if analysis is None:
                 logger.error("Failed to analyze file")
                 return 1
+            print(f"\nAnalysis for {args.file}:")
             print(f"Overall: {analysis.overall_comment}")
             print(f"Issues found: {len(analysis.issues)}")
+            for issue in analysis.issues:
+                print(f"  - {issue.severity.value}: {issue.title}")
             return 0
 
-        success = reviewer.review_pull_request(
-            repo_name=args.repo, pr_number=args.pr, dry_run=args.dry_run
-        )
+        success = asyncio.run(_review(reviewer, args))
 
         if success:
             logger.info("NeuraReview completed successfully")
@@ -73,6 +107,9 @@ def main() -> int:
             logger.error("NeuraReview failed")
 
         return 0 if success else 1
+    except KeyboardInterrupt:
+        logger.info("Review cancelled by user")
+        return 1
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
         return 1
@@ -1,6 +1,9 @@
 """Comment management and formatting for GitHub reviews."""
 
 import logging
+import re
+from collections import Counter, defaultdict
+from operator import attrgetter
 from typing import Any, Dict, List
 
 from .models import (
@@ -13,10 +16,29 @@ from .models import (
 
 logger = logging.getLogger(__name__)
 
+# Captures a suggestion without surrounding whitespace and one pair of fences
+_SUGGESTION_FENCE_RE = re.compile(r"\A\s*(?:```)?(.*?)(?:```)?\s*\Z", re.DOTALL)
+
 
 class CommentManager:
     """Manages review comment formatting and organization."""
 
+    # Severities summarized in the overall review: emoji, label and hint
+    _SEVERITY_ROWS = (
+        (
+            ReviewSeverity.CRITICAL,
+            "🔴",
+            "Critical",
+            "Security vulnerabilities, data corruption, system crashes",
+        ),
+        (
+            ReviewSeverity.HIGH,
+            "🟠",
+            "High",
+            "Memory leaks, performance bottlenecks, major bugs",
+        ),
+    )
+
     def __init__(self):
         """Initialize comment manager."""
         # Simplified badge system - just use emojis for better performance
@@ -34,12 +56,19 @@ class CommentManager:
             ChangeType.MEMORY: "💾",
             ChangeType.ERROR_HANDLING: "⚠️",
         }
+        # Every badge pair is rendered once up front
+        self._badges = {
+            (severity, change_type): (
+                f"{self.severity_emojis[severity]} "
+                f"{self.changetype_emojis[change_type]}"
+            ).strip()
+            for severity in ReviewSeverity
+            for change_type in ChangeType
+        }
 
     def _get_badges(self, severity: ReviewSeverity, change_type: ChangeType) -> str:
         """Get emoji badges for severity and change type."""
-        severity_emoji = self.severity_emojis.get(severity, "")
-        changetype_emoji = self.changetype_emojis.get(change_type, "")
-        return f"{severity_emoji} {changetype_emoji}".strip()
+        return self._badges.get((severity, change_type), "")
 
     def format_overall_review(self, analyses: List[ReviewAnalysis]) -> str:
         """Format overall review comment from multiple file analyses."""
@@ -47,15 +76,11 @@ class CommentManager:
             return "No files were analyzed in this review."
 
         # Count issues by severity
-        severity_counts = {severity: 0 for severity in ReviewSeverity}
+        severity_counts = Counter(
+            issue.severity for analysis in analyses for issue in analysis.issues
+        )
         total_files = len(analyses)
-        files_with_issues = 0
-
-        for analysis in analyses:
-            if analysis.issues:
-                files_with_issues += 1
-                for issue in analysis.issues:
-                    severity_counts[issue.severity] += 1
+        files_with_issues = sum(1 for analysis in analyses if analysis.issues)
 
         # Create summary
         summary_parts = []
@@ -66,24 +91,17 @@ class CommentManager:
         summary_parts.append("")
 
         # Issue summary - only show critical and high
-        critical_high_count = (
-            severity_counts[ReviewSeverity.CRITICAL]
-            + severity_counts[ReviewSeverity.HIGH]
-        )
+        severity_rows = [
+            (emoji, label, hint, severity_counts[severity])
+            for severity, emoji, label, hint in self._SEVERITY_ROWS
+        ]
 
-        if critical_high_count > 0:
+        if any(count for *_, count in severity_rows):
             summary_parts.append("### 🚨 Critical Issues Found")
 
-            if severity_counts[ReviewSeverity.CRITICAL] > 0:
-                summary_parts.append(
-                    f"🔴 **{severity_counts[ReviewSeverity.CRITICAL]} Critical** - "
-                    "Security vulnerabilities, data corruption, system crashes"
-                )
-            if severity_counts[ReviewSeverity.HIGH] > 0:
-                summary_parts.append(
-                    f"🟠 **{severity_counts[ReviewSeverity.HIGH]} High** - "
-                    "Memory leaks, performance bottlenecks, major bugs"
-                )
+            for emoji, label, hint, count in severity_rows:
+                if count:
+                    summary_parts.append(f"{emoji} **{count} {label}** - {hint}")
 
             summary_parts.append("")
             summary_parts.append(
@@ -105,16 +123,9 @@ class CommentManager:
             for analysis in analyses:
                 if analysis.issues:
                     issue_count = len(analysis.issues)
-                    critical_count = sum(
-                        1
-                        for issue in analysis.issues
-                        if issue.severity == ReviewSeverity.CRITICAL
-                    )
-                    high_count = sum(
-                        1
-                        for issue in analysis.issues
-                        if issue.severity == ReviewSeverity.HIGH
-                    )
+                    counts = Counter(issue.severity for issue in analysis.issues)
+                    critical_count = counts[ReviewSeverity.CRITICAL]
+                    high_count = counts[ReviewSeverity.HIGH]
 
                     status_icon = (
                         "🔴" if critical_count > 0 else "🟠" if high_count > 0 else "🟡"
@@ -156,7 +167,7 @@ class CommentManager:
         """Cleans up the suggestion string."""
         if not suggestion:
             return ""
-        return suggestion.strip().removeprefix("```").removesuffix("```").strip()
+        return _SUGGESTION_FENCE_RE.match(suggestion).group(1).strip()
 
     def group_comments_by_severity(
         self, comments: List[ReviewComment]
@@ -176,13 +187,8 @@ class CommentManager:
         filtered_comments = []
 
         for analysis in analyses:
-            if analysis.confidence >= min_confidence:
+            if self._is_confident(analysis, min_confidence):
                 filtered_comments.extend(analysis.comments)
-            else:
-                logger.info(
-                    f"Filtered out low-confidence analysis for {analysis.file_path} "
-                    f"(confidence: {analysis.confidence})"
-                )
 
         return filtered_comments
 
@@ -191,49 +197,56 @@ class CommentManager:
     ) -> List[ReviewComment]:
         """Remove duplicate comments based on content and position."""
         seen = set()
-        deduplicated = []
-
-        for comment in comments:
-            # Create a key based on file path, line, and content hash
-            key = (comment.path, comment.line, hash(comment.body))
-
-            if key not in seen:
-                seen.add(key)
-                deduplicated.append(comment)
-
-        return deduplicated
+        return [comment for comment in comments if self._is_first_seen(comment, seen)]
 
     def limit_comments_per_file(
         self, comments: List[ReviewComment], max_per_file: int = 10
     ) -> List[ReviewComment]:
         """Limit the number of comments per file to avoid spam."""
-        file_counts = {}
-        limited_comments = []
+        file_counts: Dict[str, int] = defaultdict(int)
 
         # Sort by severity (critical first)
-        severity_order = {
-            ReviewSeverity.CRITICAL: 0,
-            ReviewSeverity.HIGH: 1,
-            ReviewSeverity.MEDIUM: 2,
-            ReviewSeverity.LOW: 3,
-            ReviewSeverity.INFO: 4,
-        }
-
-        sorted_comments = sorted(
-            comments, key=lambda c: severity_order.get(c.severity, 5)
+        sorted_comments = sorted(comments, key=attrgetter("severity.rank"))
+
+        return [
+            comment
+            for comment in sorted_comments
+            if self._is_within_file_limit(comment, file_counts, max_per_file)
+        ]
+
+    def _is_confident(self, analysis: ReviewAnalysis, min_confidence: float) -> bool:
+        """Check an analysis against the confidence threshold, logging misses."""
+        if analysis.confidence >= min_confidence:
+            return True
+        logger.info(
+            "Filtered out low-confidence analysis for %s (confidence: %s)",
+            analysis.file_path,
+            analysis.confidence,
         )
-
-        for comment in sorted_comments:
-            file_path = comment.path
-            current_count = file_counts.get(file_path, 0)
-
-            if current_count < max_per_file:
-                limited_comments.append(comment)
-                file_counts[file_path] = current_count + 1
-            else:
-                logger.debug(f"Skipped comment for {file_path} (limit reached)")
-
-        return limited_comments
+        return False
+
+    def _is_first_seen(self, comment: ReviewComment, seen: set) -> bool:
+        """Record a comment's position and body, reporting if it is new."""
+        # Key on the body itself: strings cache their hash, and comparing
+        # bodies means distinct comments never collide
+        key = (comment.path, comment.line, comment.body)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    def _is_within_file_limit(
+        self,
+        comment: ReviewComment,
+        file_counts: Dict[str, int],
+        max_per_file: int,
+    ) -> bool:
+        """Count a comment against its file's limit, reporting if it fits."""
+        if file_counts[comment.path] >= max_per_file:
+            logger.debug("Skipped comment for %s (limit reached)", comment.path)
+            return False
+        file_counts[comment.path] += 1
+        return True
 
     def filter_critical_issues_only(
         self, analyses: List[ReviewAnalysis]
@@ -265,6 +278,43 @@ class CommentManager:
 
         return filtered_analyses
 
+    def _select_comments(
+        self,
+        analyses: List[ReviewAnalysis],
+        min_confidence: float,
+        max_per_file: int,
+    ) -> List[ReviewComment]:
+        """Filter by confidence, deduplicate and limit comments in one pass.
+
+        Equivalent to chaining filter_comments_by_confidence,
+        deduplicate_comments and limit_comments_per_file.
+        """
+        total_count = 0
+        candidates = []
+        for analysis in analyses:
+            total_count += len(analysis.comments)
+            if self._is_confident(analysis, min_confidence):
+                candidates.extend(analysis.comments)
+
+        # Sorting before deduplicating is safe: duplicates share a body, and so
+        # a severity badge, and the stable sort keeps the first one in front
+        candidates.sort(key=attrgetter("severity.rank"))
+
+        seen = set()
+        file_counts: Dict[str, int] = defaultdict(int)
+        selected = [
+            comment
+            for comment in candidates
+            if self._is_first_seen(comment, seen)
+            and self._is_within_file_limit(comment, file_counts, max_per_file)
+        ]
+
+        logger.info(
+            f"Filtered: {total_count} -> {len(candidates)} -> "
+            f"{len(seen)} -> {len(selected)}"
+        )
+        return selected
+
     def prepare_review_data(
         self,
         analyses: List[ReviewAnalysis],
@@ -291,18 +341,8 @@ class CommentManager:
                 },
             }
 
-        # Filter and process comments
-        all_comments = []
-        for analysis in critical_analyses:
-            all_comments.extend(analysis.comments)
-
-        # Apply filters
-        filtered_comments = self.filter_comments_by_confidence(
-            critical_analyses, min_confidence
-        )
-        deduplicated_comments = self.deduplicate_comments(filtered_comments)
-        limited_comments = self.limit_comments_per_file(
-            deduplicated_comments, max_comments_per_file
+        limited_comments = self._select_comments(
+            critical_analyses, min_confidence, max_comments_per_file
         )
 
         # Generate overall review
@@ -313,10 +353,6 @@ class CommentManager:
             f"Review prepared: {len(limited_comments)} comments from "
             f"{len(analyses)} files"
         )
-        logger.info(
-            f"Filtered: {len(all_comments)} -> {len(filtered_comments)} -> "
-            f"{len(deduplicated_comments)} -> {len(limited_comments)}"
-        )
 
         return {
             "overall_comment": overall_comment,
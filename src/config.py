@@ -2,10 +2,10 @@
 
 import os
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class GitHubConfig:
     """GitHub API configuration."""
 
@@ -13,23 +13,46 @@ class GitHubConfig:
     api_url: str = "https://api.github.com"
 
 
-@dataclass
+@dataclass(slots=True)
 class AIConfig:
     """AI service configuration."""
 
     provider: str = "openai"
-    model: str = "gpt-4.1"
+    model: str = "gpt-5-mini"
+    reasoning_effort: str = "low"
+    # Files changing fewer weighted lines (added + 2 * removed) than the
+    # threshold are reviewed with the lighter reasoning effort
+    small_change_threshold: int = 30
+    small_change_reasoning_effort: str = "minimal"
     api_key: str = ""
+    # Output budget, reasoning included, per hunk in a request
     max_tokens: int = 4000
     temperature: float = 0.1
-
-
-@dataclass
+    # Upper bound on AI requests in flight at once across all files
+    max_concurrent_requests: int = 16
+    # Retries on 429/5xx, honoring the API's retry-after header
+    max_retries: int = 5
+    # Skip hunks whose added and removed lines are all whitespace
+    skip_trivial_hunks: bool = True
+    # Also skip hunks that only delete code; off so removals still get reviewed
+    skip_deletion_only_hunks: bool = False
+    # A file's hunks go to the model in one request until their estimated size
+    # passes this many tokens; bigger files are split into concurrent requests
+    max_batch_tokens: int = 6000
+    # A request's output budget grows with its hunk count up to this cap, which
+    # also limits how many hunks go into one batch
+    max_batch_output_tokens: int = 32000
+    # Optional on-disk cache of AI responses; disabled when no path is set
+    response_cache_path: Optional[str] = None
+    response_cache_ttl: int = 7 * 24 * 60 * 60
+
+
+@dataclass(slots=True)
 class ReviewConfig:
     """Review behavior configuration."""
 
     max_files_per_pr: int = 50
-    skip_file_types: List[str] = None
+    skip_file_types: Tuple[str, ...] = None
     focus_areas: List[str] = None
     min_confidence: float = 0.7
 
@@ -59,11 +82,13 @@ class ReviewConfig:
                 ".woff2",
                 ".ttf",
             ]
+        # A lowercase tuple lets callers test a filename with one endswith call
+        self.skip_file_types = tuple(ext.lower() for ext in self.skip_file_types)
         if self.focus_areas is None:
             self.focus_areas = ["security", "performance", "quality", "bugs"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     """Main configuration class."""
 
@@ -82,8 +107,22 @@ class Config:
         if not openai_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
 
+        ai_config = AIConfig(
+            api_key=openai_key,
+            response_cache_path=os.getenv("NEURA_REVIEW_CACHE_PATH"),
+        )
+        max_requests = os.getenv("NEURA_REVIEW_MAX_CONCURRENT_REQUESTS")
+        if max_requests:
+            # Below 1 the request semaphore would block forever or fail to build
+            if not max_requests.strip().isdigit() or int(max_requests) < 1:
+                raise ValueError(
+                    "NEURA_REVIEW_MAX_CONCURRENT_REQUESTS must be an integer "
+                    f"of at least 1, got {max_requests!r}"
+                )
+            ai_config.max_concurrent_requests = int(max_requests)
+
         return cls(
             github=GitHubConfig(token=github_token),
-            ai=AIConfig(api_key=openai_key),
+            ai=ai_config,
             review=ReviewConfig(),
         )
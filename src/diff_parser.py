@@ -1,14 +1,23 @@
 """Diff parsing with correct GitHub position calculation."""
 
+import io
 import logging
-from typing import List
+from itertools import chain
+from typing import List, Tuple
 
 from unidiff import PatchSet, UnidiffParseError
+from unidiff.constants import LINE_TYPE_ADDED, LINE_TYPE_CONTEXT, LINE_TYPE_REMOVED
 
 from .models import DiffHunk, DiffLine, FileDiff, LineType
 
 logger = logging.getLogger(__name__)
 
+_LINE_TYPES = {
+    LINE_TYPE_ADDED: LineType.ADDED,
+    LINE_TYPE_REMOVED: LineType.REMOVED,
+    LINE_TYPE_CONTEXT: LineType.CONTEXT,
+}
+
 
 class DiffParser:
     """Parse diffs and calculate correct GitHub positions."""
@@ -25,8 +34,9 @@ class DiffParser:
                 file_diff.patch, file_diff.filename
             )
 
-            # Parse with unidiff
-            patch_set = PatchSet(patch_content.splitlines(keepends=True))
+            # Parse with unidiff, streaming lines from one buffer rather than
+            # materializing a list of them first
+            patch_set = PatchSet(io.StringIO(patch_content))
 
             if not patch_set:
                 logger.warning(f"No parseable hunks in patch for: {file_diff.filename}")
@@ -62,68 +72,64 @@ class DiffParser:
     def _parse_hunk(self, hunk) -> DiffHunk:
         """Parse a single hunk."""
         lines = []
-        old_line_num = hunk.source_start
-        new_line_num = hunk.target_start
+        added = []
+        removed = []
+        buckets = {LineType.ADDED: added, LineType.REMOVED: removed}
+        append_line = lines.append
 
         for line in hunk:
-            line_type = LineType.CONTEXT
-            old_line = None
-            new_line = None
-
-            if line.is_added:
-                line_type = LineType.ADDED
-                new_line = new_line_num
-                new_line_num += 1
-            elif line.is_removed:
-                line_type = LineType.REMOVED
-                old_line = old_line_num
-                old_line_num += 1
-            else:  # Context line
-                line_type = LineType.CONTEXT
-                old_line = old_line_num
-                new_line = new_line_num
-                old_line_num += 1
-                new_line_num += 1
+            # unidiff already numbers each line against both sides; markers
+            # such as "\\ No newline at end of file" have no entry and are
+            # not part of the file content
+            line_type = _LINE_TYPES.get(line.line_type)
+            if line_type is None:
+                continue
 
             diff_line = DiffLine(
                 type=line_type,
                 content=line.value.rstrip("\n"),
-                old_line_number=old_line,
-                new_line_number=new_line,
+                old_line_number=line.source_line_no,
+                new_line_number=line.target_line_no,
             )
-            lines.append(diff_line)
+            append_line(diff_line)
+            bucket = buckets.get(line_type)
+            if bucket is not None:
+                bucket.append(diff_line)
 
+        section = f" {hunk.section_header}" if hunk.section_header else ""
         return DiffHunk(
             old_start=hunk.source_start,
             old_count=hunk.source_length,
             new_start=hunk.target_start,
             new_count=hunk.target_length,
             lines=lines,
-            header=str(hunk).split("\n")[0],
+            header=(
+                f"@@ -{hunk.source_start},{hunk.source_length} "
+                f"+{hunk.target_start},{hunk.target_length} @@{section}"
+            ),
+            added_lines=added,
+            removed_lines=removed,
         )
 
     def extract_added_lines(self, file_diff: FileDiff) -> List[DiffLine]:
         """Extract all added lines from a file diff."""
-        added_lines = []
-        for hunk in file_diff.hunks:
-            for line in hunk.lines:
-                if line.type == LineType.ADDED:
-                    added_lines.append(line)
-        return added_lines
+        return list(chain.from_iterable(h.added_lines for h in file_diff.hunks))
 
     def extract_removed_lines(self, file_diff: FileDiff) -> List[DiffLine]:
         """Extract all removed lines from a file diff."""
-        removed_lines = []
+        return list(chain.from_iterable(h.removed_lines for h in file_diff.hunks))
+
+    def _count_changes(self, file_diff: FileDiff) -> Tuple[int, int]:
+        """Count added and removed lines from the per-hunk buckets."""
+        added = removed = 0
         for hunk in file_diff.hunks:
-            for line in hunk.lines:
-                if line.type == LineType.REMOVED:
-                    removed_lines.append(line)
-        return removed_lines
+            added += len(hunk.added_lines)
+            removed += len(hunk.removed_lines)
+        return added, removed
 
     def get_file_summary(self, file_diff: FileDiff) -> str:
         """Get a summary of changes in the file."""
-        added_count = len(self.extract_added_lines(file_diff))
-        removed_count = len(self.extract_removed_lines(file_diff))
+        added_count, removed_count = self._count_changes(file_diff)
 
         summary = f"File: {file_diff.filename}\n"
         summary += f"Status: {file_diff.status}\n"
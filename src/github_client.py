@@ -1,7 +1,8 @@
 """GitHub API client for NeuraReview."""
 
 import logging
-from typing import List
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from github import Auth, Github
 from github.GithubException import GithubException
@@ -10,54 +11,83 @@ from github.Repository import Repository
 
 from .config import GitHubConfig
 from .models import FileDiff, PRData, ReviewComment
+from .response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# How long a looked-up PR is reused before it's fetched again
+_PULL_CACHE_TTL = 10 * 60
+
 
 class GitHubClient:
     """GitHub API client with proper error handling."""
 
-    def __init__(self, config: GitHubConfig):
+    def __init__(
+        self, config: GitHubConfig, response_cache: Optional[ResponseCache] = None
+    ):
         """Initialize GitHub client."""
         self.config = config
+        self.response_cache = response_cache
         auth = Auth.Token(config.token)
-        self.github = Github(auth=auth)
+        # Use GitHub's maximum page size so listing PR files takes a third of
+        # the requests the default of 30 would
+        self.github = Github(auth=auth, per_page=100)
+        # Repositories and PRs looked up by this client, so a review that
+        # fetches and then posts to the same PR only resolves it once. PRs are
+        # stored with the time they were fetched since new pushes move the head
+        self._repo_cache: Dict[str, Repository] = {}
+        self._pull_cache: Dict[Tuple[str, int], Tuple[float, PullRequest]] = {}
+        # Set once the token has been checked, so later reviews skip the call
+        self._connection_validated = False
 
     def get_repository(self, repo_name: str) -> Repository:
         """Get repository by name (owner/repo)."""
+        repo = self._repo_cache.get(repo_name)
+        if repo is not None:
+            return repo
+
         try:
-            return self.github.get_repo(repo_name)
+            repo = self.github.get_repo(repo_name)
         except GithubException as e:
             logger.error(f"Failed to get repository {repo_name}: {e}")
             raise
 
-    def get_pull_request(self, repo_name: str, pr_number: int) -> PullRequest:
-        """Get pull request by number."""
+        self._repo_cache[repo_name] = repo
+        return repo
+
+    def get_pull_request(
+        self, repo_name: str, pr_number: int, refresh: bool = False
+    ) -> PullRequest:
+        """Get pull request by number, fetching it again if refresh is set."""
+        key = (repo_name, pr_number)
+        cached = self._pull_cache.get(key)
+        if (
+            cached is not None
+            and not refresh
+            and time.monotonic() - cached[0] < _PULL_CACHE_TTL
+        ):
+            return cached[1]
+
         try:
             repo = self.get_repository(repo_name)
-            return repo.get_pull(pr_number)
+            pr = repo.get_pull(pr_number)
         except GithubException as e:
             logger.error(f"Failed to get PR #{pr_number} from {repo_name}: {e}")
             raise
 
-    def fetch_pr_data(self, repo_name: str, pr_number: int) -> PRData:
+        self._pull_cache[key] = (time.monotonic(), pr)
+        return pr
+
+    def fetch_pr_data(
+        self, repo_name: str, pr_number: int, refresh: bool = True
+    ) -> PRData:
         """Fetch complete PR data including files and diffs."""
         try:
-            pr = self.get_pull_request(repo_name, pr_number)
+            # Refreshed by default so the head and base reflect the latest push
+            pr = self.get_pull_request(repo_name, pr_number, refresh=refresh)
 
             # Get all files in the PR
-            files = []
-            for github_file in pr.get_files():
-                file_diff = FileDiff(
-                    filename=github_file.filename,
-                    old_filename=getattr(github_file, "previous_filename", None),
-                    status=github_file.status,
-                    hunks=[],  # Will be populated by diff parser
-                    patch=github_file.patch or "",
-                    additions=github_file.additions,
-                    deletions=github_file.deletions,
-                )
-                files.append(file_diff)
+            files = self._get_pr_files(repo_name, pr)
 
             return PRData(
                 number=pr.number,
@@ -73,6 +103,78 @@ class GitHubClient:
             logger.error(f"Failed to fetch PR data: {e}")
             raise
 
+    def _get_pr_files(self, repo_name: str, pr: PullRequest) -> List[FileDiff]:
+        """List the PR's files, reusing a cached listing for the same commits."""
+        if self.response_cache is None:
+            return list(self._iter_file_diffs(pr))
+
+        # The file list is fully determined by the head and base commits, so a
+        # cached listing stays valid until either side moves
+        cache_key = self.response_cache.make_key(
+            {
+                "repository": repo_name,
+                "pr_files": pr.number,
+                "head_sha": pr.head.sha,
+                "base_sha": pr.base.sha,
+            }
+        )
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached PR file listing")
+            return [FileDiff(hunks=[], **entry) for entry in cached["files"]]
+
+        files = list(self._iter_file_diffs(pr))
+        self.response_cache.set(
+            cache_key,
+            {
+                "files": [
+                    {
+                        "filename": f.filename,
+                        "old_filename": f.old_filename,
+                        "status": f.status,
+                        "patch": f.patch,
+                        "additions": f.additions,
+                        "deletions": f.deletions,
+                    }
+                    for f in files
+                ]
+            },
+        )
+        return files
+
+    def iter_pr_files(
+        self, repo_name: str, pr_number: int, refresh: bool = True
+    ) -> Iterator[FileDiff]:
+        """Yield the PR's files one at a time as their pages are fetched."""
+        pr = self.get_pull_request(repo_name, pr_number, refresh=refresh)
+        yield from self._iter_file_diffs(pr)
+
+    def fetch_file_diff(
+        self, repo_name: str, pr_number: int, filename: str, refresh: bool = True
+    ) -> Optional[FileDiff]:
+        """Fetch one file of a PR, paging through the files only until it's found."""
+        return next(
+            (
+                file_diff
+                for file_diff in self.iter_pr_files(repo_name, pr_number, refresh)
+                if file_diff.filename == filename
+            ),
+            None,
+        )
+
+    def _iter_file_diffs(self, pr: PullRequest) -> Iterator[FileDiff]:
+        """Convert the PR's files to FileDiffs lazily, page by page."""
+        for github_file in pr.get_files():
+            yield FileDiff(
+                filename=github_file.filename,
+                old_filename=getattr(github_file, "previous_filename", None),
+                status=github_file.status,
+                hunks=[],  # Will be populated by diff parser
+                patch=github_file.patch or "",
+                additions=github_file.additions,
+                deletions=github_file.deletions,
+            )
+
     def post_review(
         self,
         repo_name: str,
@@ -113,8 +215,9 @@ class GitHubClient:
                     logger.info("Posted overall comment as a standalone issue comment.")
                 return True
 
-            logger.debug(f"GitHub comments to post: {github_comments}")
-            logger.debug(f"comment: {comments}")
+            # Lazy formatting: these reprs cover every comment in the review
+            logger.debug("GitHub comments to post: %s", github_comments)
+            logger.debug("comment: %s", comments)
 
             review = pr.create_review(
                 body=overall_comment, event="COMMENT", comments=github_comments
@@ -142,7 +245,7 @@ class GitHubClient:
 
             pr.create_review_comment(
                 body=comment.body,
-                commit=pr.head,
+                commit=pr.head.sha,
                 path=comment.path,
                 line=comment.line,
                 side=comment.side or "RIGHT",
@@ -156,6 +259,9 @@ class GitHubClient:
 
     def validate_connection(self) -> bool:
         """Validate GitHub connection and permissions."""
+        if self._connection_validated:
+            return True
+
         try:
             # Try to access the GitHub API rate limit instead of user info
             # This requires minimal permissions and validates the token
@@ -164,6 +270,7 @@ class GitHubClient:
                 f"GitHub API rate limit: "
                 f"{rate_limit.core.remaining}/{rate_limit.core.limit}"
             )
+            self._connection_validated = True
             return True
         except GithubException as e:
             logger.error(f"GitHub connection failed: {e}")
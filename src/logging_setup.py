@@ -0,0 +1,34 @@
+"""Logging setup for the NeuraReview command line."""
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Log to stdout and neura_review.log unless logging is already set up."""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    # Records are only queued on the calling thread; a listener thread does
+    # the console and file writes so they never block the event loop
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    handlers = [
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler("neura_review.log"),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
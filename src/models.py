@@ -1,11 +1,11 @@
 """Data models for NeuraReview."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
-class ReviewSeverity(Enum):
+class ReviewSeverity(str, Enum):
     """Severity levels for review comments."""
 
     CRITICAL = "critical"
@@ -14,8 +14,23 @@ class ReviewSeverity(Enum):
     LOW = "low"
     INFO = "info"
 
+    @property
+    def rank(self) -> int:
+        """Sort rank of the severity, starting at 0 for the most severe."""
+        return _SEVERITY_RANKS[self]
 
-class ChangeType(Enum):
+    @classmethod
+    def from_value(cls, value: str) -> "ReviewSeverity":
+        """Look up a severity by value with a plain dict lookup."""
+        return _SEVERITY_BY_VALUE[value]
+
+
+# Members are declared most severe first
+_SEVERITY_RANKS = {severity: rank for rank, severity in enumerate(ReviewSeverity)}
+_SEVERITY_BY_VALUE = {severity.value: severity for severity in ReviewSeverity}
+
+
+class ChangeType(str, Enum):
     """Types of changes for review comments - focused on critical issues only."""
 
     BUG = "bug"
@@ -24,8 +39,16 @@ class ChangeType(Enum):
     MEMORY = "memory"
     ERROR_HANDLING = "error_handling"
 
+    @classmethod
+    def from_value(cls, value: str) -> "ChangeType":
+        """Look up a change type by value with a plain dict lookup."""
+        return _CHANGE_TYPE_BY_VALUE[value]
+
 
-class LineType(Enum):
+_CHANGE_TYPE_BY_VALUE = {change_type.value: change_type for change_type in ChangeType}
+
+
+class LineType(str, Enum):
     """Types of lines in a diff."""
 
     ADDED = "+"
@@ -33,7 +56,7 @@ class LineType(Enum):
     CONTEXT = " "
 
 
-@dataclass
+@dataclass(slots=True)
 class DiffLine:
     """Represents a single line in a diff."""
 
@@ -43,7 +66,7 @@ class DiffLine:
     new_line_number: Optional[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class DiffHunk:
     """Represents a hunk in a diff."""
 
@@ -53,9 +76,23 @@ class DiffHunk:
     new_count: int
     lines: List[DiffLine]
     header: str
-
-
-@dataclass
+    # DiffParser fills these while reading the hunk; other callers can leave
+    # them out and have them derived from lines
+    added_lines: List[DiffLine] = None
+    removed_lines: List[DiffLine] = None
+
+    def __post_init__(self):
+        if self.added_lines is None:
+            self.added_lines = [
+                line for line in self.lines if line.type == LineType.ADDED
+            ]
+        if self.removed_lines is None:
+            self.removed_lines = [
+                line for line in self.lines if line.type == LineType.REMOVED
+            ]
+
+
+@dataclass(slots=True)
 class FileDiff:
     """Represents changes to a single file."""
 
@@ -68,7 +105,7 @@ class FileDiff:
     deletions: int
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewComment:
     """Represents a review comment to be posted."""
 
@@ -81,7 +118,7 @@ class ReviewComment:
     severity: ReviewSeverity = ReviewSeverity.MEDIUM
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewIssue:
     """Represents an issue found during code review."""
 
@@ -96,7 +133,7 @@ class ReviewIssue:
     change_type: ChangeType = ChangeType.BUG
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewAnalysis:
     """Complete analysis result for a file or PR."""
 
@@ -107,7 +144,7 @@ class ReviewAnalysis:
     confidence: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class PRData:
     """Pull request data."""
 
@@ -118,3 +155,8 @@ class PRData:
     base_sha: str
     files: List[FileDiff]
     repository: str
+    # Files indexed by filename, built once from ``files``
+    files_by_name: Dict[str, FileDiff] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.files_by_name = {f.filename: f for f in self.files}
@@ -2,26 +2,14 @@
 
 import asyncio
 import logging
-import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from .ai_reviewer import AIReviewer
 from .comment_manager import CommentManager
 from .config import Config
 from .diff_parser import DiffParser
 from .github_client import GitHubClient
-from .models import FileDiff, ReviewAnalysis
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("neura_review.log"),
-    ],
-)
+from .models import FileDiff, PRData, ReviewAnalysis
 
 logger = logging.getLogger(__name__)
 
@@ -32,17 +20,33 @@ class NeuraReview:
     def __init__(self, config: Config):
         """Initialize NeuraReview with configuration."""
         self.config = config
-        self.github_client = GitHubClient(config.github)
         self.diff_parser = DiffParser()
         self.ai_reviewer = AIReviewer(config.ai)
+        # PR file listings share the on-disk cache with AI responses
+        self.github_client = GitHubClient(
+            config.github, response_cache=self.ai_reviewer.response_cache
+        )
         self.comment_manager = CommentManager()
+        # PR data fetched during this instance's lifetime, by repo, number and
+        # head and base SHAs, so neither a push nor a retargeted base is
+        # answered with an older file listing
+        self._pr_cache: Dict[Tuple[str, int, str, str], PRData] = {}
 
     def review_pull_request(
         self, repo_name: str, pr_number: int, dry_run: bool = False
     ) -> bool:
         """Review a pull request and post comments."""
+        return asyncio.run(
+            self.review_pull_request_async(repo_name, pr_number, dry_run=dry_run)
+        )
+
+    async def review_pull_request_async(
+        self, repo_name: str, pr_number: int, dry_run: bool = False
+    ) -> bool:
+        """Review a pull request and post comments on the running event loop."""
         try:
             logger.info(f"Starting review of PR #{pr_number} in {repo_name}")
+            self.ai_reviewer.clear_analysis_cache()
 
             # Validate GitHub connection
             if not self.github_client.validate_connection():
@@ -51,7 +55,7 @@ class NeuraReview:
 
             # Fetch PR data
             logger.info("Fetching PR data...")
-            pr_data = self.github_client.fetch_pr_data(repo_name, pr_number)
+            pr_data = self._fetch_pr_data(repo_name, pr_number)
 
             if not pr_data.files:
                 logger.info("No files found in PR")
@@ -72,7 +76,7 @@ class NeuraReview:
 
             # Analyze files
             logger.info("Starting AI analysis...")
-            analyses = asyncio.run(self._analyze_files_async(reviewable_files))
+            analyses = await self._analyze_files_async(reviewable_files)
 
             if not analyses:
                 logger.warning("No analyses generated")
@@ -123,6 +127,25 @@ class NeuraReview:
             logger.error(f"Error during PR review: {e}", exc_info=True)
             return False
 
+    async def aclose(self) -> None:
+        """Release the AI client's connections and the response cache."""
+        await self.ai_reviewer.aclose()
+
+    def _fetch_pr_data(self, repo_name: str, pr_number: int) -> PRData:
+        """Fetch PR data once per head and base and reuse it until either moves."""
+        pr = self.github_client.get_pull_request(repo_name, pr_number, refresh=True)
+        key = (repo_name, pr.number, pr.head.sha, pr.base.sha)
+        pr_data = self._pr_cache.get(key)
+        if pr_data is None:
+            # The PR was just refreshed, so the client can reuse that lookup
+            pr_data = self.github_client.fetch_pr_data(
+                repo_name, pr_number, refresh=False
+            )
+            self._pr_cache[
+                (repo_name, pr_data.number, pr_data.head_sha, pr_data.base_sha)
+            ] = pr_data
+        return pr_data
+
     def _filter_reviewable_files(self, files: List[FileDiff]) -> List[FileDiff]:
         """Filter files that should be reviewed."""
         reviewable = []
@@ -137,7 +160,7 @@ class NeuraReview:
 
             # Skip files with no meaningful changes
             if not file_diff.patch or not file_diff.hunks:
-                logger.debug(f"Skipping {file_diff.filename} (no meaningful changes)")
+                logger.debug("Skipping %s (no meaningful changes)", file_diff.filename)
                 continue
 
             reviewable.append(file_diff)
@@ -146,17 +169,12 @@ class NeuraReview:
 
     def _should_skip_file(self, file_diff: FileDiff) -> bool:
         """Determine if a file should be skipped from review."""
-        # Skip by file extension
-        if any(
-            file_diff.filename.lower().endswith(ext)
-            for ext in self.config.review.skip_file_types
-        ):
-            logger.debug(f"Skipping {file_diff.filename} (file type excluded)")
-            return True
+        # Cheapest checks first: status and size comparisons before the
+        # filename is lowered and matched against the excluded extensions
 
         # Skip deleted files - no point reviewing deleted code
         if file_diff.status == "removed":
-            logger.debug(f"Skipping {file_diff.filename} (file deleted)")
+            logger.debug("Skipping %s (file deleted)", file_diff.filename)
             return True
 
         # Skip renamed files with no content changes
@@ -165,146 +183,123 @@ class NeuraReview:
             and file_diff.additions == 0
             and file_diff.deletions == 0
         ):
-            logger.debug(f"Skipping {file_diff.filename} (renamed without changes)")
+            logger.debug("Skipping %s (renamed without changes)", file_diff.filename)
             return True
 
         # Skip very large files to avoid overwhelming reviews
         if file_diff.additions + file_diff.deletions > 1000:
             logger.debug(
-                f"Skipping {file_diff.filename} (too many changes: "
-                f"+{file_diff.additions} -{file_diff.deletions})"
+                "Skipping %s (too many changes: +%d -%d)",
+                file_diff.filename,
+                file_diff.additions,
+                file_diff.deletions,
             )
             return True
 
-        return False
+        # Skip by file extension
+        if file_diff.filename.lower().endswith(self.config.review.skip_file_types):
+            logger.debug("Skipping %s (file type excluded)", file_diff.filename)
+            return True
 
-    def _analyze_files(self, files: List[FileDiff]) -> List[ReviewAnalysis]:
-        """Analyze multiple files in parallel."""
-        analyses = []
-        # Optimize worker count based on file count and system resources
-        max_workers = min(len(files), 5)  # Cap at 5 to avoid API rate limits
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(self.ai_reviewer.analyze_file, file_diff): file_diff
-                for file_diff in files
-            }
-
-            for future in as_completed(future_to_file):
-                file_diff = future_to_file[future]
-                try:
-                    analysis = future.result()
-                    # Only include analyses with issues
-                    if analysis and analysis.issues:
-                        analyses.append(analysis)
-                        logger.info(
-                            f"Found {len(analysis.issues)} issues in "
-                            f"{file_diff.filename}"
-                        )
-                    else:
-                        logger.debug(f"No issues found in {file_diff.filename}")
-                except Exception as e:
-                    logger.error(f"Failed to analyze {file_diff.filename}: {e}")
-
-        return analyses
+        return False
 
     async def _analyze_files_async(self, files: List[FileDiff]) -> List[ReviewAnalysis]:
         """Analyze files concurrently using asyncio and per-hunk parallelism."""
-        analyses: List[ReviewAnalysis] = []
 
-        async def analyze_one(file_diff: FileDiff) -> None:
+        async def analyze_one(file_diff: FileDiff) -> Optional[ReviewAnalysis]:
             try:
-                # Ensure hunks are parsed
-                self.diff_parser.parse_file_diff(file_diff)
-
-                # Analyze hunks in parallel
-                tasks = [
-                    self.ai_reviewer._analyze_hunk_async(file_diff, hunk)
-                    for hunk in file_diff.hunks
-                ]
-                if not tasks:
-                    logger.debug(f"No hunks found in {file_diff.filename}")
-                    return
-
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                all_issues = []
-                all_comments = []
-                for result in results:
-                    if isinstance(result, Exception):
-                        logger.error(
-                            f"Hunk analysis failed for {file_diff.filename}: {result}"
-                        )
-                        continue
-                    issues, comments = result
-                    all_issues.extend(issues)
-                    all_comments.extend(comments)
-
-                analysis = ReviewAnalysis(
-                    overall_comment=f"Review for {file_diff.filename}",
-                    issues=all_issues,
-                    comments=all_comments,
-                    file_path=file_diff.filename,
-                    confidence=0.9 if all_issues else 1.0,
-                )
+                # Files were already parsed by _filter_reviewable_files
+                if not file_diff.hunks:
+                    logger.debug("No hunks found in %s", file_diff.filename)
+                    return None
+
+                # Hunks are analyzed in parallel by the reviewer
+                analysis = await self.ai_reviewer.analyze_file_async(file_diff)
 
                 if analysis.issues:
-                    analyses.append(analysis)
                     logger.info(
-                        f"Found {len(analysis.issues)} issues in {file_diff.filename}"
+                        "Found %d issues in %s",
+                        len(analysis.issues),
+                        file_diff.filename,
                     )
-                else:
-                    logger.debug(f"No issues found in {file_diff.filename}")
+                    return analysis
+
+                logger.debug("No issues found in %s", file_diff.filename)
             except Exception as e:
                 logger.error(f"Failed to analyze {file_diff.filename}: {e}")
+            return None
 
-        # Limit total concurrency to avoid rate limits
-        semaphore = asyncio.Semaphore(5)
-
-        async def sem_task(fd: FileDiff):
-            async with semaphore:
-                await analyze_one(fd)
-
-        await asyncio.gather(*(sem_task(f) for f in files))
-        return analyses
+        # All files start at once; the reviewer's request semaphore is what
+        # bounds in-flight AI calls, so no slots sit idle between files.
+        # Results come from gather rather than appends inside the tasks, and
+        # only analyses with issues are kept
+        results = await asyncio.gather(*(analyze_one(f) for f in files))
+        return [analysis for analysis in results if analysis is not None]
 
     def _log_review_preview(self, review_data):
         """Log a preview of the review for dry runs."""
-        logger.info("=== REVIEW PREVIEW ===")
-        logger.info("Overall Comment:")
-        logger.info(review_data["overall_comment"])
-        logger.info("")
-
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
+        # Build the whole preview first and emit it as one record
+        lines = [
+            "=== REVIEW PREVIEW ===",
+            "Overall Comment:",
+            review_data["overall_comment"],
+            "",
+        ]
         for i, comment in enumerate(review_data["comments"], 1):
             line_info = (
                 f"{comment.line}"
                 if comment.start_line is None
                 else f"{comment.start_line}-{comment.line}"
             )
-            logger.info(f"Comment {i}: {comment.path}:{line_info} ({comment.side})")
-            logger.info(f"Severity: {comment.severity.value}")
-            logger.info(f"Body: {comment.body[:100]}...")
-            logger.info("---")
+            lines.extend(
+                (
+                    f"Comment {i}: {comment.path}:{line_info} ({comment.side})",
+                    f"Severity: {comment.severity.value}",
+                    f"Body: {comment.body[:100]}...",
+                    "---",
+                )
+            )
+        logger.info("\n".join(lines))
 
     def analyze_single_file(
         self, repo_name: str, pr_number: int, filename: str
     ) -> Optional[ReviewAnalysis]:
         """Analyze a single file in a PR."""
-        try:
-            pr_data = self.github_client.fetch_pr_data(repo_name, pr_number)
+        return asyncio.run(
+            self.analyze_single_file_async(repo_name, pr_number, filename)
+        )
 
-            # Find the specific file
-            target_file = None
-            for file_diff in pr_data.files:
-                if file_diff.filename == filename:
-                    target_file = file_diff
-                    break
+    async def analyze_single_file_async(
+        self, repo_name: str, pr_number: int, filename: str
+    ) -> Optional[ReviewAnalysis]:
+        """Analyze a single file in a PR on the running event loop."""
+        try:
+            self.ai_reviewer.clear_analysis_cache()
+            # Look up the current head and base first so a memo from before a
+            # push or a base change is never reused
+            pr = self.github_client.get_pull_request(repo_name, pr_number, refresh=True)
+            pr_data = self._pr_cache.get(
+                (repo_name, pr.number, pr.head.sha, pr.base.sha)
+            )
+            if pr_data is not None:
+                target_file = pr_data.files_by_name.get(filename)
+            else:
+                # Only the requested file is needed, so stop listing the PR's
+                # files as soon as it turns up
+                target_file = self.github_client.fetch_file_diff(
+                    repo_name, pr_number, filename, refresh=False
+                )
 
             if not target_file:
                 logger.error(f"File {filename} not found in PR #{pr_number}")
                 return None
 
+            self.diff_parser.parse_file_diff(target_file)
             logger.info(f"Analyzing single file: {filename}")
-            return self.ai_reviewer.analyze_file(target_file)
+            return await self.ai_reviewer.analyze_file_async(target_file)
 
         except Exception as e:
             logger.error(f"Error analyzing single file {filename}: {e}")
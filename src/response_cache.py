@@ -0,0 +1,84 @@
+"""Persistent cache for AI review responses and PR file listings."""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """SQLite-backed cache of JSON results keyed by request content."""
+
+    def __init__(self, path: str, ttl_seconds: int):
+        """Open (or create) the cache database at the given path."""
+        self.ttl_seconds = ttl_seconds
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "arguments TEXT NOT NULL, "
+            "created_at INTEGER NOT NULL)"
+        )
+        self.connection.commit()
+        self._delete_expired()
+
+    def _delete_expired(self) -> None:
+        """Drop rows older than the TTL so the database doesn't grow unbounded."""
+        try:
+            self.connection.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (int(time.time()) - self.ttl_seconds,),
+            )
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache cleanup failed: {e}")
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Build a deterministic SHA256 key from the request parameters."""
+        payload = json.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a key, or None if missing/expired."""
+        try:
+            row = self.connection.execute(
+                "SELECT arguments, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        arguments, created_at = row
+        if time.time() - created_at > self.ttl_seconds:
+            return None
+        return json.loads(arguments)
+
+    def set(self, key: str, arguments: Dict[str, Any]) -> None:
+        """Store a JSON-serializable result for a key."""
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, arguments, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(arguments), int(time.time())),
+            )
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()